@@ -42,10 +42,16 @@ echo "Setting up virtual environment with uv..."
 uv venv "$VENV_DIR"
 uv pip install -r "$SCRIPT_DIR/requirements.txt" -p "$VENV_DIR/bin/python"
 PYTHON_PATH="$VENV_DIR/bin/python"
-echo "✅ Dependencies installed (requests, icalendar)"
+echo "✅ Dependencies installed (requests, icalendar, pyobjc-framework-ScriptingBridge)"
 echo "   Python: $PYTHON_PATH"
 
-# ── Step 4: Test the script ──
+# ── Step 4: Precompile the AppleScript ──
+echo ""
+echo "Compiling AppleScript..."
+osacompile -o "$SCRIPT_DIR/send_message.scpt" "$SCRIPT_DIR/send_message.applescript"
+echo "✅ AppleScript compiled"
+
+# ── Step 5: Test the script ──
 echo ""
 echo "Testing the script..."
 cd "$SCRIPT_DIR"
@@ -53,7 +59,7 @@ cd "$SCRIPT_DIR"
 echo ""
 echo "✅ Script ran successfully (check above for any events found)"
 
-# ── Step 5: Grant permissions reminder ──
+# ── Step 6: Grant permissions reminder ──
 echo ""
 echo "⚠️  IMPORTANT: Grant Terminal permissions for iMessage"
 echo "   System Settings → Privacy & Security → Automation"
@@ -66,7 +72,7 @@ if [[ ! $REPLY =~ ^[Yy]$ ]]; then
     exit 1
 fi
 
-# ── Step 6: Generate and install launchctl plist ──
+# ── Step 7: Generate and install launchctl plist ──
 echo ""
 echo "Setting up daily launchctl job..."
 
@@ -115,7 +121,7 @@ PLIST
 
 echo "   Plist generated at: $PLIST_DEST"
 
-# ── Step 7: Load the launch agent ──
+# ── Step 8: Load the launch agent ──
 launchctl load "$PLIST_DEST"
 
 echo "✅ Launch agent loaded"
@@ -131,5 +137,5 @@ echo "Useful commands:"
 echo "  Test now:    cd $SCRIPT_DIR && $PYTHON_PATH luma_imessage.py"
 echo "  View logs:   cat $SCRIPT_DIR/luma_notifier.log"
 echo "  Uninstall:   launchctl unload $PLIST_DEST && rm $PLIST_DEST"
-echo "  Check state: cat $SCRIPT_DIR/sent_events.json"
+echo "  Check state: cat $SCRIPT_DIR/sent_events.ndjson"
 echo ""
@@ -1,19 +1,38 @@
 #!/usr/bin/env python3
+import hashlib
 import json
 import logging
+import math
 import os
 import re
+import struct
 import subprocess
 import sys
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Iterable, Iterator
 
 import requests
-from icalendar import Calendar
+from icalendar import Event, Timezone, vCalAddress
+from icalendar.prop import vDDDTypes
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from ScriptingBridge import SBApplication
+except ImportError:  # PyObjC is macOS-only; fall back to osascript
+    SBApplication = None
 
 
 SCRIPT_DIR = Path(__file__).parent.resolve()
-SENT_EVENTS_FILE = SCRIPT_DIR / "sent_events.json"
+SENT_EVENTS_FILE = SCRIPT_DIR / "sent_events.ndjson"
+SENT_EVENTS_BLOOM_FILE = SENT_EVENTS_FILE.with_suffix(".bf")
+LEGACY_SENT_EVENTS_FILE = SCRIPT_DIR / "sent_events.json"
+HTTP_CACHE_FILE = SCRIPT_DIR / "http_cache.json"
 ENV_FILE = SCRIPT_DIR / ".env"
 LOG_FILE = SCRIPT_DIR / "luma_notifier.log"
 
@@ -30,14 +49,13 @@ log = logging.getLogger(__name__)
 
 
 def load_env():
-    if ENV_FILE.exists():
-        for line in ENV_FILE.read_text().splitlines():
-            line = line.strip()
-            if line and not line.startswith("#") and "=" in line:
-                key, _, value = line.partition("=")
-                key = key.strip()
-                value = value.strip().strip("'").strip('"')
-                os.environ.setdefault(key, value)
+    if not ENV_FILE.exists():
+        return
+    for line in ENV_FILE.read_text().splitlines():
+        key, sep, value = line.partition("=")
+        key = key.strip()
+        if sep and key and not key.startswith("#"):
+            os.environ.setdefault(key, value.strip().strip("'\""))
 
 
 load_env()
@@ -45,228 +63,496 @@ load_env()
 
 GOOGLE_CALENDAR_ICS_URL = os.environ.get("GOOGLE_CALENDAR_ICS_URL", "")
 FRIEND_PHONE_NUMBER = os.environ.get("FRIEND_PHONE_NUMBER", "")
+USER_EMAIL_FRAGMENT = os.environ.get("USER_EMAIL_FRAGMENT", "sreeprasad").casefold()
+
+LUMA_URL_RE = re.compile(r"https?://(?:lu\.ma|luma\.com)/(?:event/|e/|join/)?[^\s\\]+")
+
+# Sized for ~100k events at a 1e-6 false-positive rate (~360 KB). A false
+# positive only suppresses a duplicate notification.
+SENT_EVENTS_CAPACITY = 100_000
+SENT_EVENTS_ERROR_RATE = 1e-6
+# sent_events.ndjson is an append-only audit log of sends. Once it grows past
+# SENT_LOG_COMPACT_BYTES it is rewritten with the latest SENT_LOG_LIMIT IDs.
+SENT_LOG_LIMIT = 500
+SENT_LOG_COMPACT_BYTES = 64 * 1024
+
+PST = timezone(timedelta(hours=-8))
+PDT = timezone(timedelta(hours=-7))
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
 
 
 def check_config():
-    missing = []
-    for var in ["GOOGLE_CALENDAR_ICS_URL", "FRIEND_PHONE_NUMBER"]:
-        if not os.environ.get(var):
-            missing.append(var)
+    required = {
+        "GOOGLE_CALENDAR_ICS_URL": GOOGLE_CALENDAR_ICS_URL,
+        "FRIEND_PHONE_NUMBER": FRIEND_PHONE_NUMBER,
+    }
+    missing = [var for var, value in required.items() if not value]
     if missing:
         log.error(f"Missing environment variables: {', '.join(missing)}")
         log.error(f"Set them in {ENV_FILE}")
         sys.exit(1)
 
 
-def fetch_calendar() -> Calendar:
-    log.info("Fetching Google Calendar ICS feed...")
-    resp = requests.get(GOOGLE_CALENDAR_ICS_URL, timeout=30)
-    resp.raise_for_status()
-    log.info(f"Downloaded {len(resp.content)} bytes")
-    return Calendar.from_ical(resp.content)
+def _json_loads(data: bytes):
+    return orjson.loads(data) if orjson else json.loads(data)
 
 
-def extract_luma_events(cal: Calendar, days_ahead: int = 30) -> list[dict]:
-    now = datetime.now(timezone.utc)
-    cutoff = now + timedelta(days=days_ahead)
-    luma_events = []
+def _json_line(data) -> bytes:
+    return (orjson.dumps(data) if orjson else json.dumps(data).encode()) + b"\n"
 
-    for component in cal.walk():
-        if component.name != "VEVENT":
-            continue
 
-        uid = str(component.get("UID", ""))
-        organizer = str(component.get("ORGANIZER", ""))
-        description = str(component.get("DESCRIPTION", ""))
+def _read_json(path: Path):
+    return _json_loads(path.read_bytes())
 
-        is_luma = (
-            "lu.ma" in organizer.lower()
-            or "events.lu.ma" in uid.lower()
-            or "lu.ma" in description.lower()
-            or "luma.com" in description.lower()
-        )
 
-        if not is_luma:
-            continue
+def _write_json(path: Path, data) -> None:
+    if orjson:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        path.write_text(json.dumps(data, indent=2))
 
-        attendees = component.get("ATTENDEE")
-        if attendees is None:
-            continue
 
-        if not isinstance(attendees, list):
-            attendees = [attendees]
+def load_http_cache() -> dict:
+    if not HTTP_CACHE_FILE.exists():
+        return {}
+    try:
+        data = _read_json(HTTP_CACHE_FILE)
+        refresh_at = data["refresh_at"]
+        if refresh_at and datetime.now(timezone.utc) >= datetime.fromisoformat(refresh_at):
+            return {}
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return {}
+    return data
+
+
+def save_http_cache(resp: requests.Response, refresh_at: datetime | None) -> None:
+    # Events slide into the lookahead window without the feed changing, so a
+    # 304 is only trusted until the next known Luma event enters the window.
+    data = {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+        "refresh_at": refresh_at.isoformat() if refresh_at else None,
+    }
+    _write_json(HTTP_CACHE_FILE, data)
 
-        user_accepted = False
-        for attendee in attendees:
-            partstat = attendee.params.get("PARTSTAT", "")
-            email = str(attendee).lower()
-            if partstat == "ACCEPTED" and "sreeprasad" in email:
-                user_accepted = True
-                break
 
-        if not user_accepted:
+def fetch_calendar() -> requests.Response | None:
+    log.info("Fetching Google Calendar ICS feed...")
+    cache = load_http_cache()
+    headers = {}
+    if cache.get("etag"):
+        headers["If-None-Match"] = cache["etag"]
+    if cache.get("last_modified"):
+        headers["If-Modified-Since"] = cache["last_modified"]
+
+    resp = requests.get(GOOGLE_CALENDAR_ICS_URL, headers=headers, stream=True, timeout=30)
+    if resp.status_code == 304:
+        resp.close()
+        log.info("Calendar not modified since last run")
+        return None
+    resp.raise_for_status()
+    log.info("Streaming calendar feed...")
+    return resp
+
+
+# Component names are case-insensitive, so boundaries are looked up in the
+# lowercased copy of the buffer.
+BEGIN_VEVENT = b"\nbegin:vevent"
+END_VEVENT = b"\nend:vevent"
+BEGIN_VTIMEZONE = b"\nbegin:vtimezone"
+END_VTIMEZONE = b"\nend:vtimezone"
+
+
+def _unfold(block: bytes) -> bytes:
+    if b"\r\n" not in block:  # tolerate feeds with bare LF line endings
+        block = block.replace(b"\n", b"\r\n")
+    return block.replace(b"\r\n ", b"").replace(b"\r\n\t", b"")
+
+
+def _find_luma(lowered: bytes, start: int) -> int:
+    hits = [i for i in (lowered.find(b"lu.ma", start), lowered.find(b"luma.com", start)) if i != -1]
+    return min(hits, default=-1)
+
+
+def _cache_timezones(region: bytes, lowered: bytes) -> None:
+    # VEVENTs are parsed on their own, so icalendar never sees the feed's
+    # VTIMEZONEs unless they are parsed first, which caches them by TZID.
+    pos = 0
+    while (begin := lowered.find(BEGIN_VTIMEZONE, pos)) != -1:
+        end = lowered.find(END_VTIMEZONE, begin)
+        if end == -1:
+            break
+        pos = end + len(END_VTIMEZONE)
+        try:
+            Timezone.from_ical(region[begin + 1 : pos] + b"\r\n")
+        except ValueError as e:
+            log.warning(f"Skipping unparseable VTIMEZONE: {e}")
+
+
+def iter_vevents(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    # Work on everything up to the last complete VEVENT in one go: unfold and
+    # lowercase it once, then jump from one lu.ma/luma.com hit to the next
+    # with bytes.find and only slice out the VEVENTs that contain one. The
+    # leading newline lets a VEVENT at the very start match BEGIN_VEVENT.
+    tail = b"\n"
+    for chunk in chunks:
+        buf = tail + chunk
+        cut = buf.lower().rfind(END_VEVENT)
+        if cut == -1:
+            tail = buf
             continue
-
-        dtstart = component.get("DTSTART")
-        if dtstart is None:
+        cut += len(END_VEVENT)
+        region, tail = _unfold(buf[:cut]), buf[cut:]
+        lowered = region.lower()
+        _cache_timezones(region, lowered)
+        pos = 0
+        while (hit := _find_luma(lowered, pos)) != -1:
+            begin = lowered.rfind(BEGIN_VEVENT, pos, hit)
+            if begin == -1 or lowered.rfind(END_VEVENT, begin, hit) != -1:
+                # The hit is outside any VEVENT (e.g. in the calendar header).
+                pos = hit + 1
+                continue
+            pos = lowered.find(END_VEVENT, hit) + len(END_VEVENT)
+            yield region[begin + 1 : pos] + b"\r\n"
+
+
+def _to_utc(start) -> datetime:
+    if not hasattr(start, "hour"):
+        return datetime.combine(start, datetime.min.time()).replace(tzinfo=timezone.utc)
+    if start.tzinfo is None:
+        return start.replace(tzinfo=timezone.utc)
+    return start
+
+
+def _raw_dtstart(raw: bytes) -> datetime | None:
+    # Parse DTSTART straight from the VEVENT block so out-of-window events
+    # never go through a full icalendar parse.
+    begin = raw.find(b"\r\nDTSTART")
+    if begin == -1:
+        return None
+    end = raw.find(b"\r\n", begin + 2)
+    name_params, _, value = raw[begin + 2 : end].decode().partition(":")
+    tzid = None
+    for param in name_params.split(";")[1:]:
+        key, _, param_value = param.partition("=")
+        if key.upper() == "TZID":
+            tzid = param_value.strip('"')
+    try:
+        start = vDDDTypes.from_ical(value, timezone=tzid)
+    except Exception:
+        return None
+    if tzid and getattr(start, "tzinfo", True) is None:
+        return None  # unresolved TZID; let the full parse report it
+    return _to_utc(start)
+
+
+@dataclass(slots=True)
+class LumaEvent:
+    id: str
+    name: str
+    start_at: str
+    location: str
+    url: str
+    display_date: str
+
+
+def _display_date(start: datetime) -> str:
+    # Same output as strftime("%a, %b %d at %I:%M %p") without the locale lookups.
+    local = start.astimezone(PDT if 3 <= start.month < 11 else PST)
+    hour = local.hour % 12 or 12
+    meridiem = "AM" if local.hour < 12 else "PM"
+    return (
+        f"{WEEKDAYS[local.weekday()]}, {MONTHS[local.month - 1]} {local.day:02d} "
+        f"at {hour:02d}:{local.minute:02d} {meridiem}"
+    )
+
+
+def extract_luma_events(
+    chunks: Iterable[bytes], days_ahead: int = 30
+) -> tuple[list[LumaEvent], datetime | None]:
+    # Also returns when the earliest Luma event beyond the window enters it,
+    # i.e. when the result can change without the feed changing.
+    now = datetime.now(timezone.utc)
+    cutoff = now + timedelta(days=days_ahead)
+    luma_events = []
+    next_start = None
+
+    for raw in iter_vevents(chunks):
+        component = None
+        start_dt = _raw_dtstart(raw)
+        if start_dt is None:
+            component = Event.from_ical(raw)
+            dtstart = component.get("DTSTART")
+            if dtstart is None:
+                continue
+            if getattr(dtstart.dt, "tzinfo", True) is None and "TZID" in dtstart.params:
+                log.warning(f"Unknown TZID {dtstart.params['TZID']!r}; treating start as UTC")
+            start_dt = _to_utc(dtstart.dt)
+
+        if start_dt > cutoff:
+            if next_start is None or start_dt < next_start:
+                next_start = start_dt
+            continue
+        if start_dt < now:
             continue
 
-        start_dt = dtstart.dt
-        if not hasattr(start_dt, "hour"):
-            start_dt = datetime.combine(start_dt, datetime.min.time()).replace(
-                tzinfo=timezone.utc
-            )
-        elif start_dt.tzinfo is None:
-            start_dt = start_dt.replace(tzinfo=timezone.utc)
+        if component is None:
+            component = Event.from_ical(raw)
+
+        uid = str(component.get("UID", ""))
+        organizer = str(component.get("ORGANIZER", ""))
+        description = str(component.get("DESCRIPTION", ""))
+
+        hay = (uid + "\x00" + organizer + "\x00" + description).casefold()
+        if "lu.ma" not in hay and "luma.com" not in hay:
+            continue
 
-        if start_dt < now or start_dt > cutoff:
+        # A single ATTENDEE comes back bare, several come back as a list.
+        attendees = component.get("ATTENDEE", ())
+        if isinstance(attendees, vCalAddress):
+            attendees = (attendees,)
+        user_accepted = any(
+            attendee.params.get("PARTSTAT") == "ACCEPTED"
+            and USER_EMAIL_FRAGMENT in str(attendee).casefold()
+            for attendee in attendees
+        )
+        if not user_accepted:
             continue
 
         summary = str(component.get("SUMMARY", "Untitled Event"))
         location = str(component.get("LOCATION", ""))
 
         luma_url = ""
-        url_match = re.search(
-            r"https?://(?:lu\.ma|luma\.com)/(?:event/|e/|join/)?[^\s\\]+",
-            description,
-        )
+        url_match = LUMA_URL_RE.search(description)
         if url_match:
             luma_url = url_match.group(0).rstrip("\\n").rstrip("\\")
 
         event_id = uid.split("@")[0] if "@" in uid else uid
 
         luma_events.append(
-            {
-                "id": event_id,
-                "name": summary,
-                "start_at": start_dt.isoformat(),
-                "location": location,
-                "url": luma_url,
-            }
+            LumaEvent(
+                id=event_id,
+                name=summary,
+                start_at=start_dt.isoformat(),
+                location=location,
+                url=luma_url,
+                display_date=_display_date(start_dt),
+            )
         )
 
-    luma_events.sort(key=lambda e: e["start_at"])
-    return luma_events
+    luma_events.sort(key=lambda e: datetime.fromisoformat(e.start_at))
+    refresh_at = next_start - timedelta(days=days_ahead) if next_start else None
+    return luma_events, refresh_at
+
+
+class BloomFilter:
+    HEADER = struct.Struct("<II")
+
+    def __init__(self, num_bits: int, num_hashes: int, bits: bytearray | None = None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float) -> "BloomFilter":
+        num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    @classmethod
+    def load(cls, path: Path) -> "BloomFilter":
+        data = path.read_bytes()
+        num_bits, num_hashes = cls.HEADER.unpack_from(data)
+        bits = bytearray(data[cls.HEADER.size :])
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError(f"Corrupt Bloom filter file: {path}")
+        return cls(num_bits, num_hashes, bits)
+
+    def save(self, path: Path) -> None:
+        path.write_bytes(self.HEADER.pack(self.num_bits, self.num_hashes) + self.bits)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # Double hashing: derive all k positions from one 128-bit digest.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def add_many(self, items: Iterable[str]) -> None:
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+def _load_sent_log() -> list[str]:
+    ids = []
+    if LEGACY_SENT_EVENTS_FILE.exists():
+        try:
+            ids.extend(_read_json(LEGACY_SENT_EVENTS_FILE).get("sent_event_ids", []))
+        except (ValueError, AttributeError):
+            pass
+    if SENT_EVENTS_FILE.exists():
+        for line in SENT_EVENTS_FILE.read_bytes().splitlines():
+            try:
+                ids.append(_json_loads(line)["id"])
+            except (ValueError, KeyError, TypeError):
+                continue
+    return ids
+
+
+def load_sent_events() -> BloomFilter:
+    if SENT_EVENTS_BLOOM_FILE.exists():
+        try:
+            return BloomFilter.load(SENT_EVENTS_BLOOM_FILE)
+        except (struct.error, ValueError) as e:
+            log.error(f"Rebuilding sent events filter: {e}")
+
+    # First run (or a damaged filter): seed from the audit logs.
+    sent_ids = BloomFilter.for_capacity(SENT_EVENTS_CAPACITY, SENT_EVENTS_ERROR_RATE)
+    sent_ids.add_many(_load_sent_log())
+    return sent_ids
+
+
+def _compact_sent_log() -> None:
+    entries = {}
+    for line in SENT_EVENTS_FILE.read_bytes().splitlines():
+        try:
+            entry = _json_loads(line)
+            entries.pop(entry["id"], None)
+            entries[entry["id"]] = entry
+        except (ValueError, KeyError, TypeError):
+            continue
+    kept = list(entries.values())[-SENT_LOG_LIMIT:]
+    SENT_EVENTS_FILE.write_bytes(b"".join(_json_line(entry) for entry in kept))
 
 
-def load_sent_events() -> set[str]:
-    if not SENT_EVENTS_FILE.exists():
-        return set()
-    try:
-        data = json.loads(SENT_EVENTS_FILE.read_text())
-        return set(data.get("sent_event_ids", []))
-    except (json.JSONDecodeError, KeyError):
-        return set()
+def record_sent_events(new_ids: list[str]) -> None:
+    ts = datetime.now(timezone.utc).isoformat()
+    with SENT_EVENTS_FILE.open("ab") as f:
+        f.writelines(_json_line({"id": event_id, "ts": ts}) for event_id in new_ids)
+    log.info(f"Recorded {len(new_ids)} sent event IDs")
 
+    if SENT_EVENTS_FILE.stat().st_size > SENT_LOG_COMPACT_BYTES:
+        _compact_sent_log()
 
-def save_sent_events(sent_ids: set[str]) -> None:
-    data = {
-        "sent_event_ids": sorted(sent_ids),
-        "last_updated": datetime.now(timezone.utc).isoformat(),
-    }
-    SENT_EVENTS_FILE.write_text(json.dumps(data, indent=2))
-    log.info(f"Saved {len(sent_ids)} sent event IDs")
 
+MESSAGES_BUNDLE_ID = "com.apple.MobileSMS"
+# Four-char codes for "service type" in the Messages scripting dictionary.
+SERVICE_IMESSAGE = int.from_bytes(b"imsg", "big")
+SERVICE_SMS = int.from_bytes(b"ssms", "big")
 
 
-def send_imessage(message: str) -> bool:
-    escaped_message = message.replace("\\", "\\\\").replace('"', '\\"')
-    escaped_phone = FRIEND_PHONE_NUMBER.replace('"', '\\"')
+def _bridge_error(messages, default: str) -> str:
+    error = messages.lastError()
+    return str(error.localizedDescription()) if error is not None else default
+
 
-    applescript = f'''
-    tell application "Messages"
-        set targetService to 1st account whose service type = iMessage
-        set targetBuddy to participant "{escaped_phone}" of targetService
-        send "{escaped_message}" to targetBuddy
-    end tell
-    '''
+def _bridge_send(messages, message: str, phone: str, service_type: int) -> str | None:
+    # Returns None on success, otherwise the reason for failure. Failed Apple
+    # events (e.g. Automation permission denied) don't raise; ScriptingBridge
+    # only records them in lastError().
+    for account in messages.accounts():
+        if account.serviceType() != service_type:
+            continue
+        buddy = account.participants().objectWithName_(phone).get()
+        if buddy is None:
+            return _bridge_error(messages, "participant not found")
+        messages.send_to_(message, buddy)
+        if messages.lastError() is not None:
+            return _bridge_error(messages, "send failed")
+        return None
+    return _bridge_error(messages, "no matching account")
 
+
+def _send_with_scripting_bridge(message: str) -> bool:
     try:
-        result = subprocess.run(
-            ["osascript", "-e", applescript],
-            capture_output=True,
-            text=True,
-            timeout=30,
-        )
-        if result.returncode == 0:
+        messages = SBApplication.applicationWithBundleIdentifier_(MESSAGES_BUNDLE_ID)
+        if messages is None:
+            log.error("Messages.app not found")
+            return False
+        error = _bridge_send(messages, message, FRIEND_PHONE_NUMBER, SERVICE_IMESSAGE)
+        if error is None:
             log.info("iMessage sent successfully!")
             return True
-        else:
-            log.error(f"AppleScript error: {result.stderr.strip()}")
-            return _send_sms_fallback(escaped_message, escaped_phone)
-    except subprocess.TimeoutExpired:
-        log.error("AppleScript timed out")
+        log.error(f"iMessage error: {error}")
+        log.info("Trying SMS fallback...")
+        error = _bridge_send(messages, message, FRIEND_PHONE_NUMBER, SERVICE_SMS)
+        if error is None:
+            log.info("SMS sent successfully!")
+            return True
+        log.error(f"SMS fallback also failed: {error}")
         return False
     except Exception as e:
         log.error(f"Failed to send iMessage: {e}")
         return False
 
 
-def _send_sms_fallback(message: str, phone: str) -> bool:
-    log.info("Trying SMS fallback...")
-    applescript = f'''
-    tell application "Messages"
-        send "{message}" to buddy "{phone}" of service "SMS"
-    end tell
-    '''
+def _applescript_path(name: str) -> Path:
+    # install.sh precompiles the scripts with osacompile; fall back to the
+    # plain-text source if that hasn't happened yet.
+    compiled = SCRIPT_DIR / f"{name}.scpt"
+    if compiled.exists():
+        return compiled
+    return SCRIPT_DIR / f"{name}.applescript"
+
+
+def _run_applescript(name: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        ["osascript", str(_applescript_path(name)), *args],
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+
+
+def send_imessage(message: str) -> bool:
+    if SBApplication is not None:
+        return _send_with_scripting_bridge(message)
+
+    # One osascript run tries iMessage and falls back to SMS inside the same
+    # Messages transaction; stdout reports which service was used.
     try:
-        result = subprocess.run(
-            ["osascript", "-e", applescript],
-            capture_output=True,
-            text=True,
-            timeout=30,
-        )
-        if result.returncode == 0:
-            log.info("SMS sent successfully!")
-            return True
-        else:
-            log.error(f"SMS fallback also failed: {result.stderr.strip()}")
-            return False
+        result = _run_applescript("send_message", FRIEND_PHONE_NUMBER, message)
+    except subprocess.TimeoutExpired:
+        log.error("AppleScript timed out")
+        return False
     except Exception as e:
-        log.error(f"SMS fallback error: {e}")
+        log.error(f"Failed to send iMessage: {e}")
+        return False
+
+    if result.returncode != 0:
+        log.error(f"iMessage and SMS fallback both failed: {result.stderr.strip()}")
         return False
 
+    status = result.stdout.strip()
+    if status.startswith("SMS"):
+        _, _, error = status.partition(": ")
+        log.error(f"AppleScript error: {error}")
+        log.info("SMS sent successfully!")
+    else:
+        log.info("iMessage sent successfully!")
+    return True
 
-def format_message(events: list[dict]) -> str:
-    lines = []
 
+def format_message(events: list[LumaEvent]) -> str:
     if len(events) == 1:
         e = events[0]
-        lines.append("Hey! I just registered for an event:")
-        lines.append("")
-        lines.append(e["name"])
-        date_str = _format_date(e.get("start_at", ""))
-        if date_str:
-            lines.append(date_str)
-        if e["url"]:
-            lines.append(e["url"])
-    else:
-        lines.append(f"Hey! I just registered for {len(events)} events:")
-        lines.append("")
-        for i, e in enumerate(events, 1):
-            lines.append(f"{i}. {e['name']}")
-            date_str = _format_date(e.get("start_at", ""))
-            if date_str:
-                lines.append(f"   {date_str}")
-            if e["url"]:
-                lines.append(f"   {e['url']}")
-            lines.append("")
-
-    return "\n".join(lines)
-
-
-def _format_date(start: str) -> str:
-    if not start:
-        return ""
-    try:
-        dt = datetime.fromisoformat(start)
-        pacific = timezone(timedelta(hours=-8))  # PST
-        if dt.month >= 3 and dt.month < 11:
-            pacific = timezone(timedelta(hours=-7))
-        dt_local = dt.astimezone(pacific)
-        return dt_local.strftime("%a, %b %d at %I:%M %p")
-    except (ValueError, TypeError):
-        return start
+        url = f"\n{e.url}" if e.url else ""
+        return f"Hey! I just registered for an event:\n\n{e.name}\n{e.display_date}{url}"
+
+    body = "\n\n".join(
+        f"{i}. {e.name}\n   {e.display_date}" + (f"\n   {e.url}" if e.url else "")
+        for i, e in enumerate(events, 1)
+    )
+    return f"Hey! I just registered for {len(events)} events:\n\n{body}"
 
 
 def main():
@@ -277,34 +563,49 @@ def main():
     check_config()
 
     try:
-        cal = fetch_calendar()
+        resp = fetch_calendar()
     except Exception as e:
         log.error(f"Failed to fetch calendar: {e}")
         sys.exit(1)
 
-    events = extract_luma_events(cal, days_ahead=30)
+    if resp is None:
+        log.info("No change. Done.")
+        return
+
+    try:
+        with resp:
+            events, refresh_at = extract_luma_events(
+                resp.iter_content(chunk_size=65536), days_ahead=30
+            )
+    except requests.RequestException as e:
+        log.error(f"Failed to download calendar: {e}")
+        sys.exit(1)
     log.info(f"Found {len(events)} upcoming Luma events you've RSVPed to:")
     for e in events:
-        log.info(f"  - {e['name']} ({e['id']}) on {e['start_at']}")
+        log.info("  - %s (%s) on %s", e.name, e.id, e.start_at)
 
     if not events:
         log.info("No upcoming Luma events. Done.")
+        save_http_cache(resp, refresh_at)
         return
 
     sent_ids = load_sent_events()
-    new_events = [e for e in events if e["id"] not in sent_ids]
+    new_events = [e for e in events if e.id not in sent_ids]
     log.info(f"New events to send: {len(new_events)}")
 
     if not new_events:
         log.info("No new events. Nothing to send.")
+        save_http_cache(resp, refresh_at)
         return
 
     message = format_message(new_events)
     log.info(f"Sending iMessage with {len(new_events)} event(s)...")
 
     if send_imessage(message):
-        sent_ids.update(e["id"] for e in new_events)
-        save_sent_events(sent_ids)
+        sent_ids.add_many(e.id for e in new_events)
+        sent_ids.save(SENT_EVENTS_BLOOM_FILE)
+        record_sent_events([e.id for e in new_events])
+        save_http_cache(resp, refresh_at)
         log.info(f"Done! Sent {len(new_events)} new event(s).")
     else:
         log.error("iMessage send failed. Events NOT marked as sent (will retry next run).")